@@ -4106,6 +4106,14 @@ class TestManageAccountPublishingViews:
             "_lookup_actor",
             lambda *a: {"user_id": "some-user-id"},
         )
+        monkeypatch.setattr(
+            views.PendingActiveStatePublisherForm,
+            "_lookup_actor_and_organization",
+            lambda *a: {
+                "users": [{"user_id": "some-user-id"}],
+                "organizations": [{"added": "somedatestring"}],
+            },
+        )
 
         monkeypatch.setattr(
             view, "_check_ratelimits", pretend.call_recorder(lambda: None)
@@ -4261,6 +4269,14 @@ class TestManageAccountPublishingViews:
             "_lookup_actor",
             lambda *a: {"user_id": "some-user-id"},
         )
+        monkeypatch.setattr(
+            views.PendingActiveStatePublisherForm,
+            "_lookup_actor_and_organization",
+            lambda *a: {
+                "users": [{"user_id": "some-user-id"}],
+                "organizations": [{"added": "somedatestring"}],
+            },
+        )
 
         monkeypatch.setattr(
             view, "_check_ratelimits", pretend.call_recorder(lambda: None)
@@ -4388,6 +4404,14 @@ class TestManageAccountPublishingViews:
             "_lookup_actor",
             lambda *a: {"user_id": "some-user-id"},
         )
+        monkeypatch.setattr(
+            views.PendingActiveStatePublisherForm,
+            "_lookup_actor_and_organization",
+            lambda *a: {
+                "users": [{"user_id": "some-user-id"}],
+                "organizations": [{"added": "somedatestring"}],
+            },
+        )
 
         view = views.ManageAccountPublishingViews(db_request)
 
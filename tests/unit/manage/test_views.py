@@ -6417,6 +6417,14 @@ class TestManageOIDCPublisherViews:
             "_lookup_actor",
             lambda *a: {"user_id": "some-user-id"},
         )
+        monkeypatch.setattr(
+            views.ActiveStatePublisherForm,
+            "_lookup_actor_and_organization",
+            lambda *a: {
+                "users": [{"user_id": "some-user-id"}],
+                "organizations": [{"added": "somedatestring"}],
+            },
+        )
 
         monkeypatch.setattr(
             view, "_hit_ratelimits", pretend.call_recorder(lambda: None)
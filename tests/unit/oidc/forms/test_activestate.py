@@ -10,6 +10,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import http.client
+
+from unittest import mock
+
+import orjson
 import pretend
 import pytest
 import requests
@@ -24,14 +29,102 @@ fake_username = "some-username"
 fake_org_name = "some-org"
 fake_user_info = {"user_id": "some-user-id"}
 fake_org_info = {"added": "somedatestring"}
-fake_gql_org_response = {"data": {"organizations": [fake_org_info]}}
 fake_gql_user_response = {"data": {"users": [fake_user_info]}}
 
-_requests = requests
+GQL_URL = "https://platform.activestate.com/graphql/v1/graphql"
+USER_QUERY = (
+    "query($username: String) {users(where: {username: {_eq: $username}}) {user_id}}"
+)
+ORG_QUERY = "query($orgname: String) {organizations(where: {display_name: {_eq: $orgname}}) {added}}"  # noqa: E501
+USER_AND_ORG_QUERY = "query($username: String, $orgname: String) {users(where: {username: {_eq: $username}}) {user_id} organizations(where: {display_name: {_eq: $orgname}}) {added}}"  # noqa: E501
+
+
+def _gql_call(query, variables):
+    return mock.call(
+        GQL_URL,
+        data=orjson.dumps({"query": query, "variables": variables}),
+        headers={"Content-Type": "application/json"},
+        timeout=5,
+    )
+
+
+def user_call(username):
+    return _gql_call(USER_QUERY, {"username": username})
+
+
+def org_call(orgname):
+    return _gql_call(ORG_QUERY, {"orgname": orgname})
+
+
+def user_and_org_call(username, orgname):
+    return _gql_call(USER_AND_ORG_QUERY, {"username": username, "orgname": orgname})
+
+
+LOOKUP_CASES = [
+    pytest.param(
+        pretend.stub(
+            method_name="_lookup_actor",
+            arg=fake_username,
+            expected_call=user_call(fake_username),
+            result_key="users",
+            info=fake_user_info,
+        ),
+        id="actor",
+    ),
+    pytest.param(
+        pretend.stub(
+            method_name="_lookup_organization",
+            arg=fake_org_name,
+            expected_call=org_call(fake_org_name),
+            result_key="organizations",
+            info=fake_org_info,
+        ),
+        id="organization",
+    ),
+]
 
 
-def _raise(exception):
-    raise exception
+def _make_session_stub(response=None, raiser=None):
+    session = mock.Mock(spec=requests.Session)
+    session.post.return_value = response
+    session.post.side_effect = raiser
+    return session
+
+
+def test_session_rejects_cookies():
+    headers = http.client.HTTPMessage()
+    headers["Set-Cookie"] = "session=some-session; Path=/"
+    response = pretend.stub(_original_response=pretend.stub(msg=headers))
+    request = requests.Request("POST", GQL_URL).prepare()
+
+    requests.cookies.extract_cookies_to_jar(
+        activestate._SESSION.cookies, request, response
+    )
+
+    assert list(activestate._SESSION.cookies) == []
+
+
+def test_gql_payload_template_escapes_percent():
+    query = 'query($v: String) {x(where: {n: {_like: "%a%"}, m: {_eq: $v}}) {n}}'
+    template = activestate._gql_payload_template(query, "v")
+
+    assert orjson.loads(template % {b"v": orjson.dumps("100%")}) == {
+        "query": query,
+        "variables": {"v": "100%"},
+    }
+
+
+@pytest.fixture(scope="class")
+def blank_form():
+    # The lookup helpers don't mutate the form, so it can be shared by a class
+    return activestate.ActiveStatePublisherForm()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    activestate._cached_lookup_actor.cache_clear()
+    activestate._cached_lookup_organization.cache_clear()
+    activestate._cached_lookup_actor_and_organization.cache_clear()
 
 
 class TestPendingActiveStatePublisherForm:
@@ -50,9 +143,11 @@ class TestPendingActiveStatePublisherForm:
         )
 
         # Test built-in validations
-        monkeypatch.setattr(form, "_lookup_actor", lambda *o: {"user_id": "some-id"})
-
-        monkeypatch.setattr(form, "_lookup_organization", lambda *o: None)
+        monkeypatch.setattr(
+            form,
+            "_lookup_actor_and_organization",
+            lambda *o: {"users": [fake_user_info], "organizations": [fake_org_info]},
+        )
 
         assert form._project_factory == project_factory
         assert form.validate()
@@ -79,463 +174,295 @@ class TestActiveStatePublisherForm:
         )
         form = activestate.ActiveStatePublisherForm(MultiDict(data))
 
-        monkeypatch.setattr(form, "_lookup_organization", lambda o: None)
-        monkeypatch.setattr(form, "_lookup_actor", lambda o: fake_user_info)
+        lookup = pretend.call_recorder(
+            lambda *o: {"users": [fake_user_info], "organizations": [fake_org_info]}
+        )
+        monkeypatch.setattr(form, "_lookup_actor_and_organization", lookup)
 
         assert form.validate(), str(form.errors)
+        assert form.actor_id == fake_user_info["user_id"]
+        # Both fields are validated with a single API call
+        assert lookup.calls == [pretend.call("someuser", "some-org")]
 
-    def test_lookup_actor_404(self, monkeypatch):
-        response = pretend.stub(
-            status_code=404,
-            raise_for_status=pretend.raiser(HTTPError),
-            content=b"fake-content",
-        )
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response),
-            expception=_requests.exceptions,
-            Timeout=Timeout,
-            HTTPError=HTTPError,
-            ConnectionError=ConnectionError,
+    @pytest.mark.parametrize(
+        ("lookup_data", "field", "message"),
+        [
+            (
+                {"users": [], "organizations": [fake_org_info]},
+                "actor",
+                "ActiveState actor not found",
+            ),
+            (
+                {"users": [fake_user_info], "organizations": []},
+                "organization",
+                "ActiveState organization not found",
+            ),
+        ],
+    )
+    def test_validate_not_found(self, monkeypatch, lookup_data, field, message):
+        data = MultiDict(
+            {
+                "organization": "some-org",
+                "project": "some-project",
+                "actor": "someuser",
+            }
         )
+        form = activestate.ActiveStatePublisherForm(MultiDict(data))
 
-        monkeypatch.setattr(activestate, "requests", requests)
-
-        form = activestate.ActiveStatePublisherForm()
-        with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_actor(fake_username)
-
-        assert requests.post.calls == [
-            pretend.call(
-                "https://platform.activestate.com/graphql/v1/graphql",
-                json={
-                    "query": "query($username: String) {users(where: {username: {_eq: $username}}) {user_id}}",  # noqa: E501
-                    "variables": {"username": fake_username},
-                },
-                timeout=5,
-            )
-        ]
-
-    def test_lookup_actor_other_http_error(self, monkeypatch):
-        response = pretend.stub(
-            # anything that isn't 404 or 403
-            status_code=422,
-            raise_for_status=pretend.raiser(HTTPError),
-            content=b"fake-content",
-        )
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response),
-            expception=_requests.exceptions,
-            Timeout=Timeout,
-            HTTPError=HTTPError,
-            ConnectionError=ConnectionError,
+        monkeypatch.setattr(
+            form, "_lookup_actor_and_organization", lambda *o: lookup_data
         )
-        monkeypatch.setattr(activestate, "requests", requests)
 
-        sentry_sdk = pretend.stub(capture_message=pretend.call_recorder(lambda s: None))
-        monkeypatch.setattr(activestate, "sentry_sdk", sentry_sdk)
-
-        form = activestate.ActiveStatePublisherForm()
-        with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_actor(fake_username)
-
-        assert requests.post.calls == [
-            pretend.call(
-                "https://platform.activestate.com/graphql/v1/graphql",
-                json={
-                    "query": "query($username: String) {users(where: {username: {_eq: $username}}) {user_id}}",  # noqa: E501
-                    "variables": {"username": fake_username},
-                },
-                timeout=5,
-            )
-        ]
-
-        assert sentry_sdk.capture_message.calls == [
-            pretend.call("Unexpected 422 error from ActiveState API: b'fake-content'")
-        ]
+        assert not form.validate()
+        assert form.errors == {field: [message]}
 
-    def test_lookup_actor_http_timeout(self, monkeypatch):
-        requests = pretend.stub(
-            post=pretend.raiser(Timeout),
-            Timeout=Timeout,
-            HTTPError=HTTPError,
-            ConnectionError=ConnectionError,
+    def test_validate_lookup_error_is_shared(self, monkeypatch):
+        data = MultiDict(
+            {
+                "organization": "some-org",
+                "project": "some-project",
+                "actor": "someuser",
+            }
         )
-        monkeypatch.setattr(activestate, "requests", requests)
-
-        sentry_sdk = pretend.stub(capture_message=pretend.call_recorder(lambda s: None))
-        monkeypatch.setattr(activestate, "sentry_sdk", sentry_sdk)
-
-        form = activestate.ActiveStatePublisherForm()
-        with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_actor(fake_username)
-
-        assert sentry_sdk.capture_message.calls == [
-            pretend.call("Connection error from ActiveState API")
-        ]
+        form = activestate.ActiveStatePublisherForm(MultiDict(data))
 
-    def test_lookup_actor_connection_error(self, monkeypatch):
-        requests = pretend.stub(
-            post=pretend.raiser(ConnectionError),
-            Timeout=Timeout,
-            HTTPError=HTTPError,
-            ConnectionError=ConnectionError,
+        lookup = pretend.call_recorder(
+            pretend.raiser(wtforms.validators.ValidationError("some error"))
         )
-        monkeypatch.setattr(activestate, "requests", requests)
+        monkeypatch.setattr(form, "_lookup_actor_and_organization", lookup)
 
-        sentry_sdk = pretend.stub(capture_message=pretend.call_recorder(lambda s: None))
-        monkeypatch.setattr(activestate, "sentry_sdk", sentry_sdk)
-
-        form = activestate.ActiveStatePublisherForm()
-        with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_actor(fake_username)
-
-        assert sentry_sdk.capture_message.calls == [
-            pretend.call("Connection error from ActiveState API")
-        ]
-
-    def test_lookup_actor_non_json(self, monkeypatch):
-        response = pretend.stub(
-            status_code=200,
-            raise_for_status=pretend.call_recorder(lambda: None),
-            json=lambda: _raise(_requests.exceptions.JSONDecodeError("", "", 0)),
-            content=b"",
-        )
+        assert not form.validate()
+        assert form.errors == {
+            "organization": ["some error"],
+            "actor": ["some error"],
+        }
+        # The failed lookup isn't retried for the second field
+        assert lookup.calls == [pretend.call("someuser", "some-org")]
 
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response),
-            HTTPError=HTTPError,
-            exceptions=_requests.exceptions,
+    def test_validate_actor_uses_field_data(self, monkeypatch):
+        form = activestate.ActiveStatePublisherForm(
+            MultiDict({"organization": "some-org", "actor": "someuser"})
         )
-        monkeypatch.setattr(activestate, "requests", requests)
 
-        sentry_sdk = pretend.stub(capture_message=pretend.call_recorder(lambda s: None))
-        monkeypatch.setattr(activestate, "sentry_sdk", sentry_sdk)
-
-        form = activestate.ActiveStatePublisherForm()
-        with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_actor(fake_username)
-
-        assert sentry_sdk.capture_message.calls == [
-            pretend.call("Unexpected error from ActiveState API: b''")
-        ]
-
-    def test_lookup_actor_gql_error(self, monkeypatch):
-        response = pretend.stub(
-            status_code=200,
-            raise_for_status=pretend.call_recorder(lambda: None),
-            json=lambda: {"errors": ["some error"]},
-            content=b"fake-content",
-        )
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response),
-            HTTPError=HTTPError,
-            exceptions=_requests.exceptions,
+        lookup = pretend.call_recorder(
+            lambda *o: {"users": [fake_user_info], "organizations": [fake_org_info]}
         )
-        monkeypatch.setattr(activestate, "requests", requests)
+        monkeypatch.setattr(form, "_lookup_actor_and_organization", lookup)
 
-        sentry_sdk = pretend.stub(capture_message=pretend.call_recorder(lambda s: None))
-        monkeypatch.setattr(activestate, "sentry_sdk", sentry_sdk)
+        form.validate_actor(pretend.stub(data="otheruser"))
 
-        form = activestate.ActiveStatePublisherForm()
-        with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_actor(fake_username)
-
-        assert requests.post.calls == [
-            pretend.call(
-                "https://platform.activestate.com/graphql/v1/graphql",
-                json={
-                    "query": "query($username: String) {users(where: {username: {_eq: $username}}) {user_id}}",  # noqa: E501
-                    "variables": {"username": fake_username},
-                },
-                timeout=5,
-            )
-        ]
-        assert sentry_sdk.capture_message.calls == [
-            pretend.call("Unexpected error from ActiveState API: ['some error']")
-        ]
+        assert lookup.calls == [pretend.call("otheruser", "some-org")]
 
-    def test_lookup_actor_gql_no_data(self, monkeypatch):
+    def test_lookup_actor_and_organization_succeeds(self, monkeypatch, blank_form):
         response = pretend.stub(
             status_code=200,
-            raise_for_status=pretend.call_recorder(lambda: None),
-            json=lambda: {"data": {"users": []}},
-        )
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response),
-            HTTPError=HTTPError,
-            exceptions=_requests.exceptions,
+            content=orjson.dumps(
+                {"data": {"users": [fake_user_info], "organizations": [fake_org_info]}}
+            ),
         )
-        monkeypatch.setattr(activestate, "requests", requests)
+        session = _make_session_stub(response=response)
+        monkeypatch.setattr(activestate, "_SESSION", session)
 
-        form = activestate.ActiveStatePublisherForm()
-        with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_actor(fake_username)
-
-        assert requests.post.calls == [
-            pretend.call(
-                "https://platform.activestate.com/graphql/v1/graphql",
-                json={
-                    "query": "query($username: String) {users(where: {username: {_eq: $username}}) {user_id}}",  # noqa: E501
-                    "variables": {"username": fake_username},
-                },
-                timeout=5,
-            )
-        ]
+        data = blank_form._lookup_actor_and_organization(fake_username, fake_org_name)
 
-    def test_lookup_actor_succeeds(self, monkeypatch):
-        response = pretend.stub(
-            status_code=200,
-            raise_for_status=pretend.call_recorder(lambda: None),
-            json=lambda: fake_gql_user_response,
-        )
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response),
-            HTTPError=HTTPError,
-            requests=_requests.exceptions,
-            Timeout=_requests.Timeout,
-            ConnectionError=_requests.ConnectionError,
-        )
-        monkeypatch.setattr(activestate, "requests", requests)
-
-        form = activestate.ActiveStatePublisherForm()
-        info = form._lookup_actor(fake_username)
-
-        assert requests.post.calls == [
-            pretend.call(
-                "https://platform.activestate.com/graphql/v1/graphql",
-                json={
-                    "query": "query($username: String) {users(where: {username: {_eq: $username}}) {user_id}}",  # noqa: E501
-                    "variables": {"username": fake_username},
-                },
-                timeout=5,
-            )
+        assert session.post.call_args_list == [
+            user_and_org_call(fake_username, fake_org_name)
         ]
-        assert info == fake_user_info
+        assert data == {"users": [fake_user_info], "organizations": [fake_org_info]}
 
-    # _lookup_organization
-    def test_lookup_organization_404(self, monkeypatch):
+    @pytest.mark.parametrize("lookup", LOOKUP_CASES)
+    def test_lookup_404(self, monkeypatch, blank_form, lookup):
         response = pretend.stub(
             status_code=404,
             raise_for_status=pretend.raiser(HTTPError),
             content=b"fake-content",
         )
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response),
-            HTTPError=HTTPError,
-            exceptions=_requests.exceptions,
-            Timeout=_requests.Timeout,
-            ConnectionError=_requests.ConnectionError,
-        )
-
-        monkeypatch.setattr(activestate, "requests", requests)
+        session = _make_session_stub(response=response)
+        monkeypatch.setattr(activestate, "_SESSION", session)
 
-        form = activestate.ActiveStatePublisherForm()
         with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_organization(fake_org_name)
-
-        assert requests.post.calls == [
-            pretend.call(
-                "https://platform.activestate.com/graphql/v1/graphql",
-                json={
-                    "query": "query($orgname: String) {organizations(where: {display_name: {_eq: $orgname}}) {added}}",  # noqa: E501
-                    "variables": {"orgname": fake_org_name},
-                },
-                timeout=5,
-            )
-        ]
+            getattr(blank_form, lookup.method_name)(lookup.arg)
 
-    def test_lookup_organization_other_http_error(self, monkeypatch):
+        assert session.post.call_args_list == [lookup.expected_call]
+
+    @pytest.mark.parametrize("lookup", LOOKUP_CASES)
+    def test_lookup_other_http_error(self, monkeypatch, blank_form, lookup):
         response = pretend.stub(
             # anything that isn't 404 or 403
             status_code=422,
             raise_for_status=pretend.raiser(HTTPError),
             content=b"fake-content",
         )
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response),
-            HTTPError=HTTPError,
-            exceptions=_requests.exceptions,
-            Timeout=_requests.Timeout,
-            ConnectionError=_requests.ConnectionError,
-        )
-        monkeypatch.setattr(activestate, "requests", requests)
+        session = _make_session_stub(response=response)
+        monkeypatch.setattr(activestate, "_SESSION", session)
 
         sentry_sdk = pretend.stub(capture_message=pretend.call_recorder(lambda s: None))
         monkeypatch.setattr(activestate, "sentry_sdk", sentry_sdk)
 
-        form = activestate.ActiveStatePublisherForm()
         with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_organization(fake_org_name)
-
-        assert requests.post.calls == [
-            pretend.call(
-                "https://platform.activestate.com/graphql/v1/graphql",
-                json={
-                    "query": "query($orgname: String) {organizations(where: {display_name: {_eq: $orgname}}) {added}}",  # noqa: E501
-                    "variables": {"orgname": fake_org_name},
-                },
-                timeout=5,
-            )
-        ]
+            getattr(blank_form, lookup.method_name)(lookup.arg)
+
+        assert session.post.call_args_list == [lookup.expected_call]
 
         assert sentry_sdk.capture_message.calls == [
             pretend.call("Unexpected 422 error from ActiveState API: b'fake-content'")
         ]
 
-    def test_lookup_organization_http_timeout(self, monkeypatch):
-        requests = pretend.stub(
-            post=pretend.raiser(Timeout),
-            Timeout=Timeout,
-            HTTPError=HTTPError,
-            ConnectionError=ConnectionError,
-        )
-        monkeypatch.setattr(activestate, "requests", requests)
+    @pytest.mark.parametrize("exception", [Timeout, ConnectionError])
+    @pytest.mark.parametrize("lookup", LOOKUP_CASES)
+    def test_lookup_connection_error(self, monkeypatch, blank_form, lookup, exception):
+        session = _make_session_stub(raiser=exception)
+        monkeypatch.setattr(activestate, "_SESSION", session)
 
         sentry_sdk = pretend.stub(capture_message=pretend.call_recorder(lambda s: None))
         monkeypatch.setattr(activestate, "sentry_sdk", sentry_sdk)
 
-        form = activestate.ActiveStatePublisherForm()
         with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_organization(fake_org_name)
+            getattr(blank_form, lookup.method_name)(lookup.arg)
 
         assert sentry_sdk.capture_message.calls == [
             pretend.call("Connection error from ActiveState API")
         ]
 
-    def test_lookup_organization_connection_error(self, monkeypatch):
-        requests = pretend.stub(
-            post=pretend.raiser(ConnectionError),
-            Timeout=Timeout,
-            HTTPError=HTTPError,
-            ConnectionError=ConnectionError,
+    @pytest.mark.parametrize("lookup", LOOKUP_CASES)
+    def test_lookup_non_json(self, monkeypatch, blank_form, lookup):
+        response = pretend.stub(
+            status_code=200,
+            raise_for_status=pretend.call_recorder(lambda: None),
+            content=b"",
         )
-        monkeypatch.setattr(activestate, "requests", requests)
+        session = _make_session_stub(response=response)
+        monkeypatch.setattr(activestate, "_SESSION", session)
 
         sentry_sdk = pretend.stub(capture_message=pretend.call_recorder(lambda s: None))
         monkeypatch.setattr(activestate, "sentry_sdk", sentry_sdk)
 
-        form = activestate.ActiveStatePublisherForm()
         with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_organization(fake_org_name)
+            getattr(blank_form, lookup.method_name)(lookup.arg)
 
         assert sentry_sdk.capture_message.calls == [
-            pretend.call("Connection error from ActiveState API")
+            pretend.call("Unexpected error from ActiveState API: b''")
         ]
 
-    def test_lookup_organization_non_json(self, monkeypatch):
+    @pytest.mark.parametrize("lookup", LOOKUP_CASES)
+    def test_lookup_gql_error(self, monkeypatch, blank_form, lookup):
         response = pretend.stub(
             status_code=200,
             raise_for_status=pretend.call_recorder(lambda: None),
-            json=lambda: _raise(_requests.exceptions.JSONDecodeError("", "", 0)),
-            content=b"",
+            content=orjson.dumps({"errors": ["some error"]}),
         )
-
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response),
-            HTTPError=HTTPError,
-            exceptions=_requests.exceptions,
-        )
-        monkeypatch.setattr(activestate, "requests", requests)
+        session = _make_session_stub(response=response)
+        monkeypatch.setattr(activestate, "_SESSION", session)
 
         sentry_sdk = pretend.stub(capture_message=pretend.call_recorder(lambda s: None))
         monkeypatch.setattr(activestate, "sentry_sdk", sentry_sdk)
 
-        form = activestate.ActiveStatePublisherForm()
         with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_organization(fake_org_name)
+            getattr(blank_form, lookup.method_name)(lookup.arg)
 
+        assert session.post.call_args_list == [lookup.expected_call]
         assert sentry_sdk.capture_message.calls == [
-            pretend.call("Unexpected error from ActiveState API: b''")
+            pretend.call("Unexpected error from ActiveState API: ['some error']")
         ]
 
-    def test_lookup_organization_gql_error(self, monkeypatch):
+    @pytest.mark.parametrize("lookup", LOOKUP_CASES)
+    def test_lookup_gql_no_data(self, monkeypatch, blank_form, lookup):
         response = pretend.stub(
             status_code=200,
             raise_for_status=pretend.call_recorder(lambda: None),
-            json=lambda: {"errors": ["some error"]},
-            content=b'{"errors": ["some error"]}',
+            content=orjson.dumps({"data": {lookup.result_key: []}}),
         )
+        session = _make_session_stub(response=response)
+        monkeypatch.setattr(activestate, "_SESSION", session)
 
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response),
-            HTTPError=HTTPError,
-            exceptions=_requests.exceptions,
-        )
-        monkeypatch.setattr(activestate, "requests", requests)
+        with pytest.raises(wtforms.validators.ValidationError):
+            getattr(blank_form, lookup.method_name)(lookup.arg)
 
-        sentry_sdk = pretend.stub(capture_message=pretend.call_recorder(lambda s: None))
-        monkeypatch.setattr(activestate, "sentry_sdk", sentry_sdk)
+        assert session.post.call_args_list == [lookup.expected_call]
 
-        form = activestate.ActiveStatePublisherForm()
+    @pytest.mark.parametrize("body", [{}, {"data": None}])
+    @pytest.mark.parametrize("lookup", LOOKUP_CASES)
+    def test_lookup_gql_missing_data(self, monkeypatch, blank_form, lookup, body):
+        response = pretend.stub(
+            status_code=200,
+            raise_for_status=pretend.call_recorder(lambda: None),
+            content=orjson.dumps(body),
+        )
+        session = _make_session_stub(response=response)
+        monkeypatch.setattr(activestate, "_SESSION", session)
+
+        # A response without any data is treated as "not found"
         with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_organization(fake_org_name)
-
-        assert requests.post.calls == [
-            pretend.call(
-                "https://platform.activestate.com/graphql/v1/graphql",
-                json={
-                    "query": "query($orgname: String) {organizations(where: {display_name: {_eq: $orgname}}) {added}}",  # noqa: E501
-                    "variables": {"orgname": fake_org_name},
-                },
-                timeout=5,
-            )
-        ]
-        assert sentry_sdk.capture_message.calls == [
-            pretend.call("Unexpected error from ActiveState API: ['some error']")
-        ]
+            getattr(blank_form, lookup.method_name)(lookup.arg)
+
+        assert session.post.call_args_list == [lookup.expected_call]
 
-    def test_lookup_organization_gql_no_data(self, monkeypatch):
+    @pytest.mark.parametrize("lookup", LOOKUP_CASES)
+    def test_lookup_succeeds(self, monkeypatch, blank_form, lookup):
         response = pretend.stub(
             status_code=200,
             raise_for_status=pretend.call_recorder(lambda: None),
-            json=lambda: {"data": {"organizations": []}},
-            content='{"data": {"organizations": []}}',
-        )
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response),
-            HTTPError=HTTPError,
-            exceptions=_requests.exceptions,
+            content=orjson.dumps({"data": {lookup.result_key: [lookup.info]}}),
         )
-        monkeypatch.setattr(activestate, "requests", requests)
+        session = _make_session_stub(response=response)
+        monkeypatch.setattr(activestate, "_SESSION", session)
 
-        form = activestate.ActiveStatePublisherForm()
-        with pytest.raises(wtforms.validators.ValidationError):
-            form._lookup_organization(fake_org_name)
-
-        assert requests.post.calls == [
-            pretend.call(
-                "https://platform.activestate.com/graphql/v1/graphql",
-                json={
-                    "query": "query($orgname: String) {organizations(where: {display_name: {_eq: $orgname}}) {added}}",  # noqa: E501
-                    "variables": {"orgname": fake_org_name},
-                },
-                timeout=5,
-            )
-        ]
+        info = getattr(blank_form, lookup.method_name)(lookup.arg)
+
+        assert session.post.call_args_list == [lookup.expected_call]
+        assert info == lookup.info
 
-    def test_lookup_organization_succeeds(self, monkeypatch):
+    def test_lookup_actor_caches_success(self, monkeypatch, blank_form):
         response = pretend.stub(
             status_code=200,
-            json=lambda: fake_gql_org_response,
+            content=orjson.dumps(fake_gql_user_response),
         )
-        requests = pretend.stub(
-            post=pretend.call_recorder(lambda o, **kw: response), HTTPError=HTTPError
+        session = _make_session_stub(response=response)
+        monkeypatch.setattr(activestate, "_SESSION", session)
+
+        assert blank_form._lookup_actor(fake_username) == fake_user_info
+        assert blank_form._lookup_actor(fake_username) == fake_user_info
+        assert session.post.call_count == 1
+
+        # Cached entries expire once the TTL window changes
+        monkeypatch.setattr(activestate, "_ttl_hash", lambda: -1)
+        assert blank_form._lookup_actor(fake_username) == fake_user_info
+        assert session.post.call_count == 2
+
+    def test_lookup_organization_does_not_cache_failure(self, monkeypatch, blank_form):
+        response = pretend.stub(
+            status_code=200,
+            content=orjson.dumps({"data": {"organizations": []}}),
         )
-        monkeypatch.setattr(activestate, "requests", requests)
+        session = _make_session_stub(response=response)
+        monkeypatch.setattr(activestate, "_SESSION", session)
 
-        form = activestate.ActiveStatePublisherForm()
-        form._lookup_organization(fake_org_name)
-
-        assert requests.post.calls == [
-            pretend.call(
-                "https://platform.activestate.com/graphql/v1/graphql",
-                json={
-                    "query": "query($orgname: String) {organizations(where: {display_name: {_eq: $orgname}}) {added}}",  # noqa: E501
-                    "variables": {"orgname": fake_org_name},
-                },
-                timeout=5,
+        for _ in range(2):
+            with pytest.raises(wtforms.validators.ValidationError):
+                blank_form._lookup_organization(fake_org_name)
+        assert session.post.call_count == 2
+
+    @pytest.mark.parametrize(
+        ("data", "expected_calls"),
+        [
+            ({"users": [fake_user_info], "organizations": [fake_org_info]}, 1),
+            ({"users": [fake_user_info], "organizations": []}, 2),
+            ({"users": [], "organizations": [fake_org_info]}, 2),
+        ],
+    )
+    def test_lookup_actor_and_organization_caches_only_complete(
+        self, monkeypatch, blank_form, data, expected_calls
+    ):
+        response = pretend.stub(status_code=200, content=orjson.dumps({"data": data}))
+        session = _make_session_stub(response=response)
+        monkeypatch.setattr(activestate, "_SESSION", session)
+
+        for _ in range(2):
+            assert (
+                blank_form._lookup_actor_and_organization(fake_username, fake_org_name)
+                == data
             )
-        ]
+        assert session.post.call_count == expected_calls
 
     @pytest.mark.parametrize(
         "data",
@@ -580,6 +507,11 @@ class TestActiveStatePublisherForm:
 
         monkeypatch.setattr(form, "_lookup_actor", lambda o: fake_user_info)
         monkeypatch.setattr(form, "_lookup_organization", lambda o: None)
+        monkeypatch.setattr(
+            form,
+            "_lookup_actor_and_organization",
+            lambda *o: {"users": [fake_user_info], "organizations": [fake_org_info]},
+        )
 
         assert not form.validate()
 
@@ -10,15 +10,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+import http.cookiejar
 import re
+import time
 
 from collections.abc import Callable
 from typing import Any, TypedDict
 
+import orjson
 import requests
 import sentry_sdk
 import wtforms
 
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
 from warehouse import forms
 from warehouse.i18n import localize as _
 from warehouse.oidc.forms._core import PendingPublisherMixin
@@ -26,17 +33,61 @@ from warehouse.oidc.forms._core import PendingPublisherMixin
 _VALID_PROJECT_NAME = re.compile(r"^[.a-zA-Z0-9-]{3,40}$")
 _DOUBLE_DASHES = re.compile(r"--+")
 
+
+def _gql_payload_template(query: str, *variables: str) -> bytes:
+    """Serialize a constant gql query to a JSON request body once, leaving a
+    %(name)s placeholder for the JSON encoded value of each variable"""
+    # The template is %-formatted later on, so literal "%"s must be escaped
+    placeholders = b",".join(
+        b"%s:%%(%s)s" % (orjson.dumps(v).replace(b"%", b"%%"), v.encode())
+        for v in variables
+    )
+    return b'{"query":%s,"variables":{%s}}' % (
+        orjson.dumps(query).replace(b"%", b"%%"),
+        placeholders,
+    )
+
+
 _ACTIVESTATE_GRAPHQL_API_URL = "https://platform.activestate.com/graphql/v1/graphql"
 _GRAPHQL_GET_ORGANIZATION = "query($orgname: String) {organizations(where: {display_name: {_eq: $orgname}}) {added}}"  # noqa: E501
 _GRAPHQL_GET_ACTOR = (
     "query($username: String) {users(where: {username: {_eq: $username}}) {user_id}}"
 )
+_GRAPHQL_GET_ACTOR_AND_ORGANIZATION = "query($username: String, $orgname: String) {users(where: {username: {_eq: $username}}) {user_id} organizations(where: {display_name: {_eq: $orgname}}) {added}}"  # noqa: E501
+
+_GRAPHQL_GET_ORGANIZATION_PAYLOAD = _gql_payload_template(
+    _GRAPHQL_GET_ORGANIZATION, "orgname"
+)
+_GRAPHQL_GET_ACTOR_PAYLOAD = _gql_payload_template(_GRAPHQL_GET_ACTOR, "username")
+_GRAPHQL_GET_ACTOR_AND_ORGANIZATION_PAYLOAD = _gql_payload_template(
+    _GRAPHQL_GET_ACTOR_AND_ORGANIZATION, "username", "orgname"
+)
+
+# A single, module-level session so that back-to-back lookups against the
+# ActiveState API reuse pooled keep-alive connections instead of paying for a
+# fresh TLS handshake on every request. It is shared by every request and thread
+# in the worker, so it must not carry any per-user state: the lookups are
+# anonymous, and the cookie jar rejects every cookie so that nothing set by the
+# API (or its load balancer) leaks from one user's lookup into another's.
+_SESSION = requests.Session()
+_SESSION.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=Retry(total=0)),
+)
+
+# Successful lookups are cached for (at most) this many seconds, see _ttl_hash.
+_LOOKUP_CACHE_TTL = 300
 
 
 class UserResponse(TypedDict):
     user_id: str
 
 
+class OrganizationResponse(TypedDict):
+    added: str
+
+
 class GqlResponse(TypedDict):
     data: dict[str, Any]
     errors: list[dict[str, Any]]
@@ -57,17 +108,18 @@ def _no_leading_or_trailing_dashes(form, field):
 
 
 def _activestate_gql_api_call(
-    query: str,
+    payload_template: bytes,
     variables: dict[str, str],
     response_handler: Callable[[GqlResponse], Any],
 ) -> Any:
+    payload = payload_template % {
+        name.encode(): orjson.dumps(value) for name, value in variables.items()
+    }
     try:
-        response = requests.post(
+        response = _SESSION.post(
             _ACTIVESTATE_GRAPHQL_API_URL,
-            json={
-                "query": query,
-                "variables": variables,
-            },
+            data=payload,
+            headers={"Content-Type": "application/json"},
             timeout=5,
         )
         if response.status_code == 404:
@@ -93,7 +145,7 @@ def _activestate_gql_api_call(
         )
     # Graphql reports it's errors within the body of the 200 response
     try:
-        response_json = response.json()
+        response_json = orjson.loads(response.content)
         errors = response_json.get("errors")
         if errors:
             sentry_sdk.capture_message(
@@ -104,7 +156,7 @@ def _activestate_gql_api_call(
             )
 
         return response_handler(response_json)
-    except requests.exceptions.JSONDecodeError:
+    except orjson.JSONDecodeError:
         sentry_sdk.capture_message(
             f"Unexpected error from ActiveState API: {response.content!r}"
         )
@@ -113,6 +165,81 @@ def _activestate_gql_api_call(
         )
 
 
+def _ttl_hash() -> int:
+    """Return a value that changes every _LOOKUP_CACHE_TTL seconds. Passing it
+    to a functools.lru_cache'd function expires the entries cached before"""
+    return int(time.monotonic() // _LOOKUP_CACHE_TTL)
+
+
+class _IncompleteLookup(Exception):
+    """Raised to keep a batched lookup that didn't find both the actor and the
+    organization out of the cache"""
+
+    def __init__(self, data: dict[str, Any]):
+        super().__init__()
+        self.data = data
+
+
+def _activestate_gql_lookup(
+    payload_template: bytes,
+    variables: dict[str, str],
+    result_key: str,
+    not_found_message: str,
+) -> Any:
+    """Make gql API call to the ActiveState API and return the first result
+    under ``result_key``, or fail validation if there is none"""
+
+    def process_response(response: GqlResponse) -> Any:
+        results = (response.get("data") or {}).get(result_key)
+        if results:
+            return results[0]
+        else:
+            raise wtforms.validators.ValidationError(not_found_message)
+
+    return _activestate_gql_api_call(payload_template, variables, process_response)
+
+
+# Only successful lookups end up in these caches: functools.lru_cache doesn't
+# store calls that raise, so failed lookups are retried on the next call.
+@functools.lru_cache(maxsize=1024)
+def _cached_lookup_organization(
+    org_url_name: str, ttl_hash: int
+) -> OrganizationResponse:
+    return _activestate_gql_lookup(
+        _GRAPHQL_GET_ORGANIZATION_PAYLOAD,
+        {"orgname": org_url_name},
+        "organizations",
+        _("ActiveState organization not found"),
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _cached_lookup_actor(actor: str, ttl_hash: int) -> UserResponse:
+    return _activestate_gql_lookup(
+        _GRAPHQL_GET_ACTOR_PAYLOAD,
+        {"username": actor},
+        "users",
+        _("ActiveState actor not found"),
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _cached_lookup_actor_and_organization(
+    actor: str, org_url_name: str, ttl_hash: int
+) -> dict[str, Any]:
+    def process_response(response: GqlResponse) -> dict[str, Any]:
+        data = response.get("data") or {}
+        if not (data.get("users") and data.get("organizations")):
+            raise _IncompleteLookup(data)
+        return data
+
+    return _activestate_gql_api_call(
+        _GRAPHQL_GET_ACTOR_AND_ORGANIZATION_PAYLOAD,
+        {"username": actor, "orgname": org_url_name},
+        process_response,
+    )
+
+
 class ActiveStatePublisherBase(forms.Form):
     __params__ = ["organization", "project", "actor"]
 
@@ -146,45 +273,74 @@ class ActiveStatePublisherBase(forms.Form):
         ]
     )
 
-    def _lookup_organization(self, org_url_name: str) -> None:
+    _batched_lookup: (
+        tuple[tuple[str, str], dict[str, Any] | wtforms.validators.ValidationError]
+        | None
+    ) = None
+
+    def _lookup_organization(self, org_url_name: str) -> OrganizationResponse:
         """Make gql API call to the ActiveState API to check if the organization
         exists"""
-
-        def process_org_response(response: GqlResponse) -> None:
-            data = response.get("data")
-            if data and not data.get("organizations"):
-                raise wtforms.validators.ValidationError(
-                    _("ActiveState organization not found")
-                )
-
-        return _activestate_gql_api_call(
-            _GRAPHQL_GET_ORGANIZATION, {"orgname": org_url_name}, process_org_response
-        )
-
-    def validate_organization(self, field):
-        self._lookup_organization(field.data)
+        return _cached_lookup_organization(org_url_name, _ttl_hash())
 
     def _lookup_actor(self, actor: str) -> UserResponse:
         """Make gql API call to the ActiveState API to check if the actor/username
         exists and return the associated user id"""
+        return _cached_lookup_actor(actor, _ttl_hash())
+
+    def _lookup_actor_and_organization(
+        self, actor: str, org_url_name: str
+    ) -> dict[str, Any]:
+        """Make a single gql API call to the ActiveState API to look up both the
+        actor/username and the organization, and return the query data"""
+        try:
+            return _cached_lookup_actor_and_organization(
+                actor, org_url_name, _ttl_hash()
+            )
+        except _IncompleteLookup as exc:
+            return exc.data
+
+    def _actor_and_organization(
+        self, actor: str | None, org_url_name: str | None
+    ) -> dict[str, Any] | None:
+        """Return the batched lookup for the given actor and organization, or
+        None if either one is missing. The result (or the validation error) is
+        shared between the field validators, so validating the form costs a
+        single API call"""
+        if not actor or not org_url_name:
+            return None
+
+        key = (actor, org_url_name)
+        batched = self._batched_lookup
+        if batched is None or batched[0] != key:
+            result: dict[str, Any] | wtforms.validators.ValidationError
+            try:
+                result = self._lookup_actor_and_organization(actor, org_url_name)
+            except wtforms.validators.ValidationError as exc:
+                result = exc
+            batched = self._batched_lookup = (key, result)
+
+        if isinstance(batched[1], wtforms.validators.ValidationError):
+            raise batched[1]
+        return batched[1]
 
-        def process_actor_response(response: GqlResponse) -> UserResponse:
-            users = response.get("data", {}).get("users", [])
-            if users:
-                return users[0]
-            else:
-                raise wtforms.validators.ValidationError(
-                    _("ActiveState actor not found")
-                )
-
-        return _activestate_gql_api_call(
-            _GRAPHQL_GET_ACTOR, {"username": actor}, process_actor_response
-        )
+    def validate_organization(self, field):
+        data = self._actor_and_organization(self.actor.data, field.data)
+        if data is None:
+            self._lookup_organization(field.data)
+        elif not data.get("organizations"):
+            raise wtforms.validators.ValidationError(
+                _("ActiveState organization not found")
+            )
 
     def validate_actor(self, field):
-        actor = field.data
-
-        actor_info = self._lookup_actor(actor)
+        data = self._actor_and_organization(field.data, self.organization.data)
+        if data is None:
+            actor_info = self._lookup_actor(field.data)
+        elif data.get("users"):
+            actor_info = data["users"][0]
+        else:
+            raise wtforms.validators.ValidationError(_("ActiveState actor not found"))
 
         self.actor_id = actor_info["user_id"]
 